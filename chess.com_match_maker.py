@@ -5,11 +5,14 @@ It uses the Elo rating system, Eco codes, time controls, gaming style vector,
 and recent win streak to find the best opponent for a given player.
 """
 
-import cloudscraper
+import asyncio
+import aiohttp
 import psycopg2
 import psycopg2.extras
 import numpy as np
 import re
+import diskcache
+import orjson
 from collections import Counter
 from datetime import timezone, datetime
 
@@ -19,8 +22,42 @@ USERS = [
     "ashot2016", "toshevgeorgi70", "TakeMyCheetos"
 ]
 
+# Chess.com API: plain HTTPS with a browser-like UA, all requests in flight at once
+HEADERS = {"User-Agent": "MyApp/1.0"}
+MAX_CONNECTIONS = 32
+MAX_CONCURRENT_USERS = 8  # users whose archives are being fetched at once (Chess.com rate limits)
+
+# Monthly archives cached on disk by URL as (etag, last_modified, fetched_at, body).
+# A body fetched after its month ended never changes, so it is served straight
+# from the cache; anything older is revalidated with If-None-Match / If-Modified-Since
+ARCHIVE_CACHE = diskcache.Cache(".chesscom_cache")
+
 # Eco codes to track for style vector
 ECO_CODES = [f"{c}{i:02d}" for c in "ABCDE" for i in range(100)]  
+ECO_INDEX = {code: i for i, code in enumerate(ECO_CODES)}
+ECO_RE = re.compile(r'\[ECO "([A-E]\d{2})"\]')
+
+# On-disk/in-memory dtype of style_vec: stored as raw bytes in a BYTEA column
+# (ALTER TABLE player_features ALTER COLUMN style_vec TYPE BYTEA USING NULL;)
+STYLE_DTYPE = np.dtype("<f4")
+
+# Running per-user totals so each run only folds in games it hasn't seen yet
+# (ALTER TABLE player_features ADD COLUMN eco_counts BYTEA,
+#   ADD COLUMN time_counts JSONB, ADD COLUMN last_game_end_time TIMESTAMPTZ;)
+COUNTS_DTYPE = np.dtype("<i4")
+
+# Game result → streak step; any other result (draws etc.) ends the streak
+RESULT_DELTA = {"win": 1, "checkmated": -1, "timeout": -1, "resigned": -1}
+
+
+# JSONB params are serialized with orjson rather than stdlib json
+def orjson_dumps(obj):
+    return orjson.dumps(obj).decode()
+
+
+# time_control string → column in every loaded user's dense tp_vec
+# (rebuilt by load_all_features)
+TC_VOCAB = {}
 
 # Weights for matchmaking (@TODO: perform A/B testing to improve)
 WEIGHTS = {
@@ -31,18 +68,65 @@ WEIGHTS = {
 }
 
 
-def get_user_matches(username, months=3):
+async def fetch_json(session, url):
+    async with session.get(url) as resp:
+        resp.raise_for_status()  # error pages (404, 429, HTML from a proxy) aren't JSON to parse
+        return orjson.loads(await resp.read())
+
+
+def month_end(url):
+    """When the month of an archive URL (.../games/YYYY/MM) ends, as a UTC datetime."""
+    year, month = map(int, url.rstrip("/").split("/")[-2:])
+    return datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+async def fetch_archive(session, url):
+    """
+    Fetch one monthly archive, reusing the cached body when possible:
+    a body fetched after its month ended is final and skips the network,
+    anything else sends a conditional request and keeps the cached body on a 304.
+    """
+    cached = ARCHIVE_CACHE.get(url)
+    if cached and cached.get("fetched_at", 0) >= month_end(url).timestamp():
+        return cached["body"]
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    fetched_at = datetime.now(timezone.utc).timestamp()
+    async with session.get(url, headers=headers) as resp:
+        if resp.status == 304 and cached:
+            # Still current as of now, which may make it final
+            ARCHIVE_CACHE.set(url, {**cached, "fetched_at": fetched_at})
+            return cached["body"]
+        resp.raise_for_status()
+        body = orjson.loads(await resp.read())
+        if resp.status == 200:
+            ARCHIVE_CACHE.set(url, {
+                "etag":          resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "fetched_at":    fetched_at,
+                "body":          body,
+            })
+        return body
+
+
+async def get_user_matches_async(session, username, months=3):
     """
     Fetch up to `months` worth of monthly archives (~90 games).
+    All months are downloaded concurrently (through the archive cache);
+    archive order is preserved.
     """
-    scraper = cloudscraper.create_scraper(browser={"custom": "MyApp/1.0"})
-    archives = scraper.get(
-        f"https://api.chess.com/pub/player/{username}/games/archives"
-    ).json().get("archives", [])
+    archives = (await fetch_json(
+        session, f"https://api.chess.com/pub/player/{username}/games/archives"
+    )).get("archives", [])
     recent = archives[-months:]
+    monthly = await asyncio.gather(*[fetch_archive(session, url) for url in recent])
     games = []
-    for url in recent:
-        games.extend(scraper.get(url).json().get("games", []))
+    for month in monthly:
+        games.extend(month.get("games", []))
     return games  # List of game dicts
 
 
@@ -59,140 +143,232 @@ def get_streak(username, games, max_checks=30):
     """
     Compute win(+)/loss(-) streak over last up to `max_checks` games.
     """
+    u = username.lower()
     streak = 0
     for g in games[:max_checks]:
-        me = g["white"] if g["white"]["username"].lower() == username.lower() else g["black"]
-        res = me["result"]
-        if res == "win":
-            streak = streak + 1 if streak >= 0 else 1
-        elif res in ("checkmated", "timeout", "resigned"):
-            streak = streak - 1 if streak <= 0 else -1
-        else:
-            break
+        me = g["white"] if g["white"]["username"].lower() == u else g["black"]
+        d = RESULT_DELTA.get(me["result"])
+        if d is None:
+            break  # draw/abandoned etc. ends the streak
+        streak = d if streak and (streak > 0) != (d > 0) else streak + d
     return streak  # int
 
 
-def get_time_preferences(games):
+def get_time_preferences(time_counts):
     """
-    Returns a dict {time_control: fraction_of_games}.
+    Returns a dict {time_control: fraction_of_games} from per-control game counts.
     """
-    cnt = Counter(g["time_control"] for g in games)
+    cnt = time_counts
     total = sum(cnt.values()) or 1
     return {tc: c/total for tc, c in cnt.items()}
 
 
-def get_style_vector(games):
+def get_eco_counts(games):
+    """
+    Count games per tracked ECO code (int32 array aligned with ECO_CODES).
+    """
+    idxs = np.empty(len(games), dtype=np.int32)
+    k = 0
+    for g in games:
+        pgn = g["pgn"]
+        # Tags live in the header block, so games without an ECO tag
+        # (e.g. Chess960) don't scan their whole movetext
+        header_end = pgn.find("\n\n")
+        m = ECO_RE.search(pgn, 0, header_end if header_end != -1 else len(pgn))
+        if m:
+            idxs[k] = ECO_INDEX[m.group(1)]
+            k += 1
+    return np.bincount(idxs[:k], minlength=len(ECO_CODES)).astype(COUNTS_DTYPE)
+
+
+def get_style_vector(eco_counts):
     """
-    Build normalized frequency vector over tracked ECO_CODES
+    Build normalized frequency vector over tracked ECO_CODES from `get_eco_counts`
     Note: the length of the vector vec quantifies the diversity of the player's style
     @TODO: use this to make smart (AI) predictions on how to improve their gameplay
     @TODO: make visual of the style vector for user consumption; explanations
     """
-    codes = [
-        re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1)
-        for g in games if "[ECO" in g["pgn"]
-    ]
-    cnt = Counter(codes)
-    vec = np.array([cnt.get(code, 0) for code in ECO_CODES], dtype=float)
-    norm = vec.sum() or 1
-    return (vec / norm).tolist()  # JSON-serializable list of floats
+    vec = eco_counts.astype(np.float64)
+    vec /= vec.sum() or 1
+    return vec.tolist()  # JSON-serializable list of floats
 
 
-def persist_features(conn, username, feats):
+def persist_all_features(conn, feats_by_user):
     """
-    Upsert the features for `username` into Postgres.
-    Uses INSERT ... ON CONFLICT for atomic insert/update. 
+    Upsert the features for every user in `feats_by_user` into Postgres
+    with a single INSERT ... ON CONFLICT (execute_values, one round-trip per page).
+    style_vec is stored L2-normalized so cosine similarity is a plain dot product,
+    as raw float32 bytes so loading it needs no JSON parsing.
     """
+    rows = []
+    for username, feats in feats_by_user.items():
+        sv = np.array(feats["style_vec"], dtype=float)
+        sv /= np.linalg.norm(sv) or 1.0
+        rows.append((
+            username,
+            feats["rating"],
+            feats["streak"],
+            psycopg2.extras.Json(feats["time_pref"], dumps=orjson_dumps),   # auto-serializes to JSONB :contentReference[oaicite:2]{index=2}
+            psycopg2.Binary(sv.astype(STYLE_DTYPE).tobytes()),
+            psycopg2.Binary(feats["eco_counts"].astype(COUNTS_DTYPE).tobytes()),
+            psycopg2.extras.Json(feats["time_counts"], dumps=orjson_dumps),
+            feats["last_game_end_time"]
+        ))
     with conn.cursor() as cur:
-        cur.execute("""
+        psycopg2.extras.execute_values(cur, """
             INSERT INTO player_features
-              (username, rating, streak, time_pref, style_vec, last_updated)
-            VALUES
-              (%s, %s, %s, %s::jsonb, %s::jsonb, NOW())
+              (username, rating, streak, time_pref, style_vec,
+               eco_counts, time_counts, last_game_end_time, last_updated)
+            VALUES %s
             ON CONFLICT (username) DO UPDATE
             SET
               rating       = EXCLUDED.rating,
               streak       = EXCLUDED.streak,
               time_pref    = EXCLUDED.time_pref,
               style_vec    = EXCLUDED.style_vec,
+              eco_counts   = EXCLUDED.eco_counts,
+              time_counts  = EXCLUDED.time_counts,
+              last_game_end_time = EXCLUDED.last_game_end_time,
               last_updated = NOW();
-        """, (
-            username,
-            feats["rating"],
-            feats["streak"],
-            psycopg2.extras.Json(feats["time_pref"]),   # auto-serializes to JSONB :contentReference[oaicite:2]{index=2}
-            psycopg2.extras.Json(feats["style_vec"])
-        ))
+        """, rows, template="(%s, %s, %s, %s::jsonb, %s, %s, %s::jsonb, %s, NOW())", page_size=500)
     conn.commit()
 
 
+def load_feature_state(conn):
+    """
+    Load the running totals for every user: username → (eco_counts, time_counts, last_game_end_time).
+    Users without stored totals start from zero counts and no cutoff.
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+        cur.execute("SELECT username, eco_counts, time_counts, last_game_end_time FROM player_features;")
+        rows = cur.fetchall()
+    state = {}
+    for r in rows:
+        if r["eco_counts"] is None:
+            continue
+        state[r["username"]] = (
+            np.frombuffer(r["eco_counts"], dtype=COUNTS_DTYPE).copy(),
+            Counter(r["time_counts"] or {}),
+            r["last_game_end_time"]
+        )
+    return state
+
+
 def load_all_features(conn):
     """
-    Load all player_features rows into a dict username → feat_dict
+    Load all player_features rows into a dict username → feat_dict.
+    time_pref is also expanded to a dense float32 `tp_vec` over TC_VOCAB,
+    so time-control overlap is a dot product. Rows without a style_vec or
+    time_pref (e.g. left NULL by the BYTEA migration until their next upsert)
+    are skipped.
     """
     with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-        cur.execute("SELECT * FROM player_features;")
+        cur.execute("SELECT * FROM player_features WHERE style_vec IS NOT NULL AND time_pref IS NOT NULL;")
         rows = cur.fetchall()
+    TC_VOCAB.clear()
+    for r in rows:
+        for tc in r["time_pref"]:
+            TC_VOCAB.setdefault(tc, len(TC_VOCAB))
     result = {}
     for r in rows:
+        tp = r["time_pref"]
+        tp_vec = np.zeros(len(TC_VOCAB), dtype=np.float32)
+        tp_vec[[TC_VOCAB[tc] for tc in tp]] = list(tp.values())
         result[r["username"]] = {
             "rating":    r["rating"],
             "streak":    r["streak"],
-            "time_pref": r["time_pref"],
-            "style_vec": np.array(r["style_vec"], dtype=float)
+            "time_pref": tp,
+            "tp_vec":    tp_vec,
+            "style_vec": np.frombuffer(r["style_vec"], dtype=STYLE_DTYPE)  # unit-norm
         }
     return result
 
 
-def cosine_similarity(a, b):
-    """Compute cosine similarity between two numpy arrays."""
-    dot = float(np.dot(a, b))
-    norm = float(np.linalg.norm(a) * np.linalg.norm(b)) or 1.0
-    return dot / norm
+def build_feature_matrix(all_feats):
+    """
+    Stack the per-user feature dicts into column arrays (one row per user) so
+    a challenger can be scored against every candidate in a few NumPy ops.
+    Style vectors arrive L2-normalized from Postgres; the per-user tp_vecs
+    (all over the same TC_VOCAB) stack into the time-preference matrix.
+    """
+    names = list(all_feats)
+    time_mat = np.array([all_feats[n]["tp_vec"] for n in names], dtype=np.float32).reshape(len(names), -1)
+    style = np.array([all_feats[n]["style_vec"] for n in names], dtype=STYLE_DTYPE)
+    return {
+        "names":    names,
+        "index":    {name: i for i, name in enumerate(names)},
+        "ratings":  np.array([all_feats[n]["rating"] for n in names], dtype=float),
+        "streaks":  np.array([all_feats[n]["streak"] for n in names], dtype=float),
+        "style":    style,
+        "time_mat": time_mat,
+    }
 
 
-def score_opponent(u_feats, o_feats, w):
+def find_opponent(challenger, matrix, weights):
     """
+    Select the best opponent for `challenger` from a `build_feature_matrix` result.
     Composite score: rating proximity, streak smoothing, time-control match,
-    and style diversity (1 - cosine similarity).
-    """
-    diff = abs(u_feats["rating"] - o_feats["rating"])
-    rating_score = np.exp(- (diff**2) / (2 * (50**2)))  # Gaussian peak :contentReference[oaicite:3]{index=3}
-    streak_score = np.exp(-abs(u_feats["streak"]) / 5)
-    time_score   = sum(
-        u_feats["time_pref"].get(tc, 0) * o_feats["time_pref"].get(tc, 0)
-        for tc in u_feats["time_pref"]
-    )
-    style_score  = 1 - cosine_similarity(u_feats["style_vec"], o_feats["style_vec"])
-    return (
-        w["w_rating"] * rating_score +
-        w["w_streak"] * streak_score +
-        w["w_time"]   * time_score +
-        w["w_style"]  * style_score
+    and style diversity (1 - cosine similarity), computed for all candidates at once.
+    """
+    i = matrix["index"][challenger]
+    ratings, time_mat, style = matrix["ratings"], matrix["time_mat"], matrix["style"]
+
+    rating_score = np.exp(- ((ratings - ratings[i])**2) / (2 * (50**2)))
+    streak_score = np.exp(-abs(matrix["streaks"][i]) / 5)
+    time_score   = time_mat @ time_mat[i]
+    style_score  = 1 - style @ style[i]
+    scores = (
+        weights["w_rating"] * rating_score +
+        weights["w_streak"] * streak_score +
+        weights["w_time"]   * time_score +
+        weights["w_style"]  * style_score
     )
 
+    # Candidates: within 300 rating points and sharing at least one time control
+    eligible = (np.abs(ratings - ratings[i]) <= 300) & ((time_mat > 0) @ (time_mat[i] > 0))
+    eligible[i] = False
+    if not eligible.any():
+        return None
+    scores = np.where(eligible, scores, -np.inf)
+    top_names = [matrix["names"][j] for j in np.flatnonzero(scores == scores.max())]
+    return max(top_names)  # same tie-break as sorting (score, name) descending; you can randomize if you prefer
+
 
-def find_opponent(challenger, all_feats, weights):
+def compute_features(user, gs, state=None):
     """
-    Select the best opponent for `challenger` from `all_feats`.
+    Extract the matchmaking features for `user` from their games `gs`.
+    Opening/time-control totals from `state` (see `load_feature_state`) are
+    extended with only the games that ended after its cutoff.
     """
-    u = all_feats[challenger]
-    candidates = [
-        (name, f) for name, f in all_feats.items()
-        if name != challenger
-        and abs(f["rating"] - u["rating"]) <= 300
-        and any(tc in u["time_pref"] for tc in f["time_pref"])
-    ]
-    scored = [(score_opponent(u, feat, weights), name) for name, feat in candidates]
-    if not scored:
-        return None
-    scored.sort(reverse=True)
-    top_score = scored[0][0]
-    top_names = [n for s, n in scored if s == top_score]
-    return top_names[0]  # pick the first of ties; you can randomize if you prefer
+    eco_counts, time_counts, last = state or (np.zeros(len(ECO_CODES), dtype=COUNTS_DTYPE), Counter(), None)
+    cutoff = last.timestamp() if last else float("-inf")
+    new_games = [g for g in gs if g["end_time"] > cutoff]
+    if new_games:
+        eco_counts = eco_counts + get_eco_counts(new_games)
+        time_counts = time_counts + Counter(g["time_control"] for g in new_games)
+        last = datetime.fromtimestamp(max(g["end_time"] for g in new_games), timezone.utc)
+    return {
+        "rating":  get_current_rating(user, gs),
+        "streak":  get_streak(user, gs),
+        "time_pref": get_time_preferences(time_counts),
+        "style_vec": get_style_vector(eco_counts),
+        "eco_counts": eco_counts,
+        "time_counts": dict(time_counts),
+        "last_game_end_time": last
+    }
 
 
-if __name__ == "__main__":
+async def process_user(session, sem, user, state=None):
+    """
+    Fetch games for `user` (at most MAX_CONCURRENT_USERS at a time) and extract
+    their features in a worker thread so other users' downloads keep flowing.
+    """
+    async with sem:
+        gs = await get_user_matches_async(session, user)
+    return await asyncio.to_thread(compute_features, user, gs, state)
+
+
+async def main():
     # 1) Connect to Postgres
     conn = psycopg2.connect(
         dbname="chequemate",
@@ -208,21 +384,33 @@ if __name__ == "__main__":
         print("Failed to connect to Postgres")
         exit(1)
 
-    # 2) For each active user: fetch games → extract feats → persist
-    for user in USERS:
-        gs = get_user_matches(user)
-        feats = {
-            "rating":  get_current_rating(user, gs),
-            "streak":  get_streak(user, gs),
-            "time_pref": get_time_preferences(gs),
-            "style_vec": get_style_vector(gs)
-        }
-        persist_features(conn, user, feats)
+    # 2) For all active users concurrently: fetch games → fold new games into
+    #    the stored totals → extract feats; then persist all users in one upsert
+    state = load_feature_state(conn)
+    sem = asyncio.Semaphore(MAX_CONCURRENT_USERS)
+    connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        results = await asyncio.gather(
+            *[process_user(session, sem, u, state.get(u)) for u in USERS], return_exceptions=True
+        )
+    # One user's failed fetch (or a user without games) doesn't stop the others being persisted
+    feats_by_user = {}
+    for user, result in zip(USERS, results):
+        if isinstance(result, Exception):
+            print(f"Skipping {user}: {result!r}")
+        else:
+            feats_by_user[user] = result
+    if feats_by_user:
+        persist_all_features(conn, feats_by_user)
 
     # 3) Load all features and find a match for one challenger
-    features = load_all_features(conn)
+    features = build_feature_matrix(load_all_features(conn))
     challenger = "guessworkceoke"
     opponent = find_opponent(challenger, features, WEIGHTS)
     print(f"Matched {challenger} → {opponent}")
 
     conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,19 +9,246 @@ chess.com game data.
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
 import matplotlib.pyplot as plt
-import seaborn as sns
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import pandas as pd
 import numpy as np
-import cloudscraper
-from collections import Counter
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
+import diskcache
+import os
+import tempfile
+import hashlib
+import functools
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import re
 import io
 import base64
+try:
+    # SIMD (AVX2/AVX-512/NEON, picked at runtime) base64 codec; returns str directly
+    from pybase64 import b64encode_as_string
+except ImportError:
+    def b64encode_as_string(data):
+        return base64.b64encode(data).decode('ascii')
 
 from langflow.custom import Component
 from langflow.io import MessageTextInput, Output
 from langflow.schema import Data, Message
-from datetime import datetime
+from datetime import datetime, timezone
+
+# chess.com API responses cached on disk by URL. Archives of months that have
+# ended never change, so they are kept forever; the archive index and the
+# current month expire after ARCHIVE_TTL seconds
+ARCHIVE_CACHE = diskcache.Cache(os.path.join(tempfile.gettempdir(), "chess_visualizer_cache"))
+ARCHIVE_TTL = 3600
+MAX_FETCH_WORKERS = 8  # monthly archives downloaded in parallel
+HTTP_TIMEOUT = 10  # seconds
+
+# api.chess.com is a plain public JSON API, so a pooled requests session is all we
+# need (no cloudscraper challenge handling). One session for the whole module keeps
+# TLS connections alive across archive fetches and ChessVisualizerCore instances
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "ChessVisualizer/1.0", "Accept": "application/json"})
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=MAX_FETCH_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                      raise_on_status=False),
+))
+
+_ECO_RE = re.compile(r'\[ECO "([A-E]\d{2})"\]')
+LOSS_RESULTS = ("checkmated", "timeout", "resigned")
+NUM_ECO_CODES = 5 * 100  # A00-E99; code "Xnn" lives at index (X - 'A') * 100 + nn
+
+# Opening family labels and colours, in A-E order
+FAMILIES = tuple('ABCDE')
+FAMILY_NAMES = {'A': 'Flank', 'B': 'Semi-Open', 'C': 'Open', 'D': 'Closed', 'E': 'Indian'}
+FAMILY_LONG_NAMES = {
+    'A': 'Flank Openings', 'B': 'Semi-Open Games', 'C': 'Open Games',
+    'D': 'Closed Games', 'E': 'Indian Defenses'
+}
+FAMILY_LABELS = tuple(f"{f} ({FAMILY_NAMES[f]})" for f in FAMILIES)
+FAMILY_COLORS = ('#ff9999', '#66b3ff', '#99ff99', '#ffcc99', '#ff99cc')
+
+# Signature openings behind the spider charts' tactical/positional metrics; the
+# report chart uses the core pair, the detailed profile adds one more of each
+TACTICAL_CODES = frozenset(('B01', 'C02'))
+POSITIONAL_CODES = frozenset(('D00', 'A00'))
+DETAILED_TACTICAL_CODES = TACTICAL_CODES | {'C44'}
+DETAILED_POSITIONAL_CODES = POSITIONAL_CODES | {'D06'}
+
+# Metric axes of the radar and spider charts, in drawing order; each chart computes its
+# raw scores as one array in this order and clips them to 0-100 in a single pass
+RADAR_CHARACTERISTICS = ('Rating Level', 'Recent Form', 'Blitz Preference', 'Rapid Preference',
+                         'Opening Diversity')
+SPIDER_METRICS = ('Tactical Play', 'Positional Play', 'Opening Knowledge', 'Aggressive Style',
+                  'Solid Defense', 'Time Management', 'Consistency', 'Rating Level')
+DETAILED_SPIDER_METRICS = ('Tactical Sharpness', 'Positional Play', 'Opening Knowledge', 'Aggressive Style',
+                           'Solid Defense', 'Time Management', 'Consistency', 'Rating Strength')
+
+# Box behind the spider charts' value labels; Text copies these props, so one dict serves every label
+VALUE_LABEL_BBOX = dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8)
+
+# Rendered charts (data URIs), most recently used last
+RENDER_CACHE = OrderedDict()
+RENDER_CACHE_SIZE = 64
+RENDER_CACHE_LOCK = threading.Lock()
+
+# Embedded chart encoding: dpi 100 keeps PNGs ~40% smaller than dpi 150 and
+# faster to encode; pure vector charts (spider) are embedded as SVG instead
+FIG_DPI = 100
+IMAGE_MIME = {"png": "image/png", "svg": "image/svg+xml"}
+B64_CHUNK = 3 * 64 * 1024  # multiple of 3, so chunks encode without padding and can be concatenated
+
+# Langflow resolves each component output separately; they all share one fetch +
+# analysis per username, reused for PIPELINE_TTL-second buckets. The work runs on
+# PIPELINE_POOL and concurrent callers for the same user wait on the same future
+PIPELINE_TTL = 60
+PIPELINE_TIMEOUT = 30  # seconds an output waits for its pipeline
+PIPELINE_CACHE = {}  # (username, time bucket) -> Future of compute_pipeline
+PIPELINE_CACHE_LOCK = threading.Lock()
+PIPELINE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chess-pipeline")
+
+# Embedded charts are plain Figures (never registered with pyplot), but the style
+# context they render under swaps the global rcParams, so they render one at a time
+RENDER_LOCK = threading.RLock()
+
+# generate_all_charts draws the simple, radar and spider charts in worker processes
+# (matplotlib rendering is CPU-bound and holds the GIL), one chart per worker. The
+# pool is created on first use and kept; its workers are spawned, not forked, so they
+# never inherit locks held by this process's threads (PIPELINE_POOL, matplotlib, diskcache)
+INTERACTIVE_CHARTS = ("simple", "radar", "spider")
+CHART_WORKERS = len(INTERACTIVE_CHARTS)
+CHART_TIMEOUT = 60  # seconds to wait for a worker before drawing the chart in process
+CHART_POOL = None
+CHART_POOL_LOCK = threading.Lock()
+
+
+def is_closed_month(url):
+    """True if a monthly archive URL (.../games/YYYY/MM) is for a month that has already ended."""
+    now = datetime.now(timezone.utc)
+    year, month = map(int, url.rstrip("/").split("/")[-2:])
+    return (year, month) < (now.year, now.month)
+
+
+def recent_month_urls(username, months, now=None):
+    """Archive URLs for the last `months` calendar months (oldest first), current month included."""
+    now = now or datetime.now(timezone.utc)
+    current = now.year * 12 + now.month - 1
+    return [
+        f"https://api.chess.com/pub/player/{username.lower()}/games/{m // 12}/{m % 12 + 1:02d}"
+        for m in range(current - months + 1, current + 1)
+    ]
+
+
+def fast_style(render):
+    """
+    Run a chart method under RENDER_LOCK and matplotlib's 'fast' style (path
+    simplification, chunked Agg paths).
+    """
+    @functools.wraps(render)
+    def wrapper(*args, **kwargs):
+        with RENDER_LOCK, plt.style.context('fast'):
+            return render(*args, **kwargs)
+    return wrapper
+
+
+def compute_pipeline(username):
+    """
+    Fetch and analyse username's recent games (see ChessVisualizerCore._compute_analysis).
+    Runs on PIPELINE_POOL, which also renders the report charts in the background
+    so they are cached by the time an output asks for them.
+    """
+    result = visualizer_core._compute_analysis(username)
+    if result["games"]:
+        PIPELINE_POOL.submit(prerender_charts, username, result["games"])
+    return result
+
+
+def prerender_charts(username, games):
+    """Warm RENDER_CACHE with the report charts."""
+    try:
+        visualizer_core.generate_comprehensive_viz(username, games=games)
+        visualizer_core.generate_spider_chart(username, games=games)
+    except Exception as e:
+        print(f"❌ Error prerendering charts for {username}: {e}")
+
+
+def render_interactive_chart(kind, username, analysis):
+    """
+    ProcessPoolExecutor worker for generate_all_charts: draw one interactive chart
+    from an already computed analysis on a fresh headless core and return its data URI.
+    """
+    return getattr(ChessVisualizerCore(), f"{kind}_style_visualization")(username, analysis=analysis)
+
+
+def chart_pool():
+    """The shared chart ProcessPoolExecutor, created on first use."""
+    global CHART_POOL
+    with CHART_POOL_LOCK:
+        if CHART_POOL is None:
+            CHART_POOL = ProcessPoolExecutor(max_workers=CHART_WORKERS,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return CHART_POOL
+
+
+def drop_chart_pool(pool):
+    """Shut down a broken or stuck chart pool so the next chart_pool() call starts a fresh one."""
+    global CHART_POOL
+    with CHART_POOL_LOCK:
+        if CHART_POOL is pool:
+            CHART_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_pipeline(username):
+    """compute_pipeline(username), shared by all component outputs within a time bucket."""
+    key = (username.lower(), int(time.time() // PIPELINE_TTL))
+    with PIPELINE_CACHE_LOCK:
+        future = PIPELINE_CACHE.get(key)
+        if future is None:
+            for stale in [k for k in PIPELINE_CACHE if k[1] != key[1]]:
+                del PIPELINE_CACHE[stale]
+            future = PIPELINE_CACHE[key] = PIPELINE_POOL.submit(compute_pipeline, username)
+    
+    try:
+        result = future.result(timeout=PIPELINE_TIMEOUT)
+    finally:
+        # Errors and empty fetches (which is how fetch errors show up) aren't kept around
+        if future.done() and (future.exception() is not None or not future.result()["games"]):
+            with PIPELINE_CACHE_LOCK:
+                if PIPELINE_CACHE.get(key) is future:
+                    del PIPELINE_CACHE[key]
+    return result
+
+
+def render_key(chart, username, games):
+    """Cache key for a rendered chart; the game URLs pin down exactly which games went into it."""
+    urls = "\n".join(g["url"] for g in games)
+    return (chart, username, hashlib.sha1(urls.encode()).hexdigest())
+
+
+def cached_render(key):
+    with RENDER_CACHE_LOCK:
+        uri = RENDER_CACHE.get(key)
+        if uri is not None:
+            RENDER_CACHE.move_to_end(key)
+        return uri
+
+
+def store_render(key, uri):
+    with RENDER_CACHE_LOCK:
+        RENDER_CACHE[key] = uri
+        if len(RENDER_CACHE) > RENDER_CACHE_SIZE:
+            RENDER_CACHE.popitem(last=False)
+    return uri
 
 
 class chess_visualizer(Component):
@@ -62,23 +289,73 @@ class chess_visualizer(Component):
         )
     ]
 
+    def _pipeline(self):
+        """This run's shared fetch + analysis, computed by the first output that needs it."""
+        result = getattr(self, "_pipeline_result", None)
+        if result is None or result["username"].lower() != self.username.lower():
+            result = run_pipeline(self.username)
+            if result["games"]:  # an empty fetch is retried by the next output
+                self._pipeline_result = result
+        return result
+
     def generate_html_report(self) -> Message:
         """Generate HTML report with embedded images for file saving."""
         username = self.username
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         
         try:
-            visualizer = ChessVisualizerCore()
+            visualizer = visualizer_core
+            result = self._pipeline()
+            games = result["games"]
             
             # Generate comprehensive chart
-            comprehensive_chart = visualizer.generate_comprehensive_viz(username)
+            comprehensive_chart = visualizer.generate_comprehensive_viz(username, games=games)
             
-            # Generate spider chart  
-            spider_chart = visualizer.generate_spider_chart(username)
-            
-            if comprehensive_chart and spider_chart:
-                # Create complete HTML document
-                html_content = f"""<!DOCTYPE html>
+            if comprehensive_chart and result.get("codes"):
+                # With ECO data both charts exist (the spider chart needs codes)
+                try:
+                    spider_chart = visualizer.generate_spider_chart(username, games=games) or ""
+                except Exception as e:
+                    print(f"❌ Error generating spider chart for {username}: {e}")
+                    spider_chart = ""
+                # A plain str, so previews, frozen vertices and every downstream reader see the whole page
+                return Message(text="".join(self._iter_html_report(username, timestamp, now, comprehensive_chart, spider_chart)))
+            else:
+                error_html = f"""<!DOCTYPE html>
+<html><head><title>Chess Analysis Error</title></head>
+<body style="font-family: Arial, sans-serif; padding: 20px;">
+    <div style="background: #e74c3c; color: white; padding: 20px; border-radius: 8px;">
+        <h3>❌ Visualization Failed</h3>
+        <p>Could not generate visualizations for username: <strong>{username}</strong></p>
+        <p>Please check:</p>
+        <ul>
+            <li>Username exists on chess.com</li>
+            <li>User has played recent games</li>
+            <li>API access is available</li>
+        </ul>
+    </div>
+</body></html>"""
+                return Message(text=error_html)
+                
+        except Exception as e:
+            error_html = f"""<!DOCTYPE html>
+<html><head><title>Chess Analysis Error</title></head>
+<body style="font-family: Arial, sans-serif; padding: 20px;">
+    <div style="background: #e74c3c; color: white; padding: 20px; border-radius: 8px;">
+        <h3>❌ Error Occurred</h3>
+        <p>An error occurred while generating visualizations for <strong>{username}</strong>:</p>
+        <p><code>{str(e)}</code></p>
+    </div>
+</body></html>"""
+            return Message(text=error_html)
+
+    def _iter_html_report(self, username, timestamp, now, comprehensive_chart, spider_chart):
+        """
+        Pieces of the complete HTML document, the already rendered chart data URIs
+        included as they are, so the page is joined once without re-formatting them.
+        """
+        yield f"""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -144,19 +421,24 @@ class chess_visualizer(Component):
         <div class="header">
             <h1>🎯 Chess Style Analysis Report</h1>
             <h2>{username}</h2>
-            <p class="timestamp">Generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}</p>
+            <p class="timestamp">Generated: {now.strftime("%B %d, %Y at %I:%M %p")}</p>
         </div>
         
         <div class="content">
             <div class="chart-section">
                 <h2 class="chart-title">📊 Comprehensive Opening Analysis</h2>
-                <img src="{comprehensive_chart}" class="chart-image" alt="Comprehensive Chess Analysis">
+                <img src=\""""
+        yield comprehensive_chart
+        yield f"""" class="chart-image" alt="Comprehensive Chess Analysis">
                 <p>This comprehensive analysis shows your opening preferences across ECO families, top played openings, family distribution, and key statistics.</p>
             </div>
             
             <div class="chart-section">
                 <h2 class="chart-title">🕷️ Player Profile Spider Chart</h2>
-                <img src="{spider_chart}" class="chart-image" alt="Chess Profile Spider Chart">
+                <img src=\""""
+        
+        yield spider_chart
+        yield f"""" class="chart-image" alt="Chess Profile Spider Chart">
                 <p>The spider chart visualizes your playing style across 8 key metrics including tactical play, positional understanding, opening knowledge, and consistency.</p>
             </div>
         </div>
@@ -170,47 +452,17 @@ class chess_visualizer(Component):
     </div>
 </body>
 </html>"""
-                
-                return Message(text=html_content)
-            else:
-                error_html = f"""<!DOCTYPE html>
-<html><head><title>Chess Analysis Error</title></head>
-<body style="font-family: Arial, sans-serif; padding: 20px;">
-    <div style="background: #e74c3c; color: white; padding: 20px; border-radius: 8px;">
-        <h3>❌ Visualization Failed</h3>
-        <p>Could not generate visualizations for username: <strong>{username}</strong></p>
-        <p>Please check:</p>
-        <ul>
-            <li>Username exists on chess.com</li>
-            <li>User has played recent games</li>
-            <li>API access is available</li>
-        </ul>
-    </div>
-</body></html>"""
-                return Message(text=error_html)
-                
-        except Exception as e:
-            error_html = f"""<!DOCTYPE html>
-<html><head><title>Chess Analysis Error</title></head>
-<body style="font-family: Arial, sans-serif; padding: 20px;">
-    <div style="background: #e74c3c; color: white; padding: 20px; border-radius: 8px;">
-        <h3>❌ Error Occurred</h3>
-        <p>An error occurred while generating visualizations for <strong>{username}</strong>:</p>
-        <p><code>{str(e)}</code></p>
-    </div>
-</body></html>"""
-            return Message(text=error_html)
 
     def generate_file_info(self) -> Message:
         """Generate file information for the Save File component."""
         username = self.username
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"chess_analysis_{username}_{timestamp}"
+        now = datetime.now()
+        filename = f"chess_analysis_{username}_{now.strftime('%Y%m%d_%H%M%S')}"
         
         file_info = f"""File Details:
 • Filename: {filename}.html
 • Username: {username}
-• Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+• Generated: {now.strftime("%Y-%m-%d %H:%M:%S")}
 • Content: Complete HTML report with embedded base64 images
 • Format: Self-contained HTML file (no external dependencies)
 
@@ -223,13 +475,14 @@ This file can be opened in any web browser to view the interactive charts and an
         username = self.username
         
         try:
-            visualizer = ChessVisualizerCore()
+            visualizer = visualizer_core
+            games = self._pipeline()["games"]
             
             # Generate comprehensive chart
-            comprehensive_chart = visualizer.generate_comprehensive_viz(username)
+            comprehensive_chart = visualizer.generate_comprehensive_viz(username, games=games)
             
             # Generate spider chart  
-            spider_chart = visualizer.generate_spider_chart(username)
+            spider_chart = visualizer.generate_spider_chart(username, games=games)
             
             if comprehensive_chart and spider_chart:
                 # Create HTML output with embedded images
@@ -292,22 +545,20 @@ This file can be opened in any web browser to view the interactive charts and an
         username = self.username
         
         try:
-            visualizer = ChessVisualizerCore()
-            games = visualizer.get_user_matches(username, months=3)
+            result = self._pipeline()
+            games = result["games"]
             
             if not games:
                 return Data(value=f"❌ No games found for {username}")
             
             # Extract analysis data
-            codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                     for g in games if '[ECO' in g["pgn"]]
+            codes, code_counts, family_counts = result["codes"], result["code_counts"], result["family_counts"]
             
             if not codes:
                 return Data(value=f"❌ No ECO data found for {username}")
             
-            code_counts = Counter(codes)
-            rating = visualizer.get_current_rating(username, games)
-            streak = visualizer.get_streak(username, games)
+            rating = result["rating"]
+            streak = result["streak"]
             
             # Generate text summary
             total_games = len(games)
@@ -315,10 +566,6 @@ This file can be opened in any web browser to view the interactive charts and an
             unique_openings = len(code_counts)
             most_played = code_counts.most_common(1)[0] if code_counts else ("N/A", 0)
             
-            # Family distribution
-            family_counts = Counter(code[0] for code in codes)
-            family_names = {'A': 'Flank', 'B': 'Semi-Open', 'C': 'Open', 'D': 'Closed', 'E': 'Indian'}
-            
             summary = f"""
 🎯 CHESS ANALYSIS SUMMARY: {username}
 {'='*50}
@@ -335,7 +582,7 @@ This file can be opened in any web browser to view the interactive charts and an
 """
             for family, count in family_counts.most_common():
                 percentage = (count / len(codes)) * 100
-                name = family_names.get(family, family)
+                name = FAMILY_NAMES.get(family, family)
                 summary += f"• {name} ({family}): {count} games ({percentage:.1f}%)\n"
             
             summary += f"""
@@ -346,8 +593,9 @@ This file can be opened in any web browser to view the interactive charts and an
                 summary += f"{i:2d}. {opening}: {count} games ({percentage:.1f}%)\n"
             
             # Calculate simple metrics
-            tactical_score = min((sum(1 for c in codes if c[0] in 'BC') / len(codes)) * 100, 100)
-            positional_score = min((sum(1 for c in codes if c[0] in 'DE') / len(codes)) * 100, 100)
+            family_bins = result["family_bins"]
+            tactical_score = min((family_bins[1:3].sum() / len(codes)) * 100, 100)  # B + C
+            positional_score = min((family_bins[3:5].sum() / len(codes)) * 100, 100)  # D + E
             diversity_score = (unique_openings / len(codes)) * 100
             
             summary += f"""
@@ -382,9 +630,26 @@ class ChessVisualizerCore:
     """
     
     def __init__(self):
-        """Initialize the visualizer with ECO codes and scraper."""
-        self.ECO_CODES = [f"{c}{i:02d}" for c in "ABCDE" for i in range(100)]
-        self.scraper = cloudscraper.create_scraper(browser={"custom": "ChessVisualizer/1.0"})
+        """Initialize the visualizer with the shared HTTP session."""
+        self.session = SESSION
+        self._codes_cache = None  # (games, analyze_codes result) for the last games list parsed
+        self._player_cache = None  # (games, username, preprocess_games result) likewise
+        # Matplotlib runs on Agg here, so the interactive charts are encoded for the report
+        # instead of going to plt.show(); set this to False when running with a GUI backend
+        self.headless = True
+    
+    def fetch_json(self, url, expire=ARCHIVE_TTL):
+        """
+        GET `url` as parsed JSON, going through ARCHIVE_CACHE (`expire=None` keeps it forever).
+        Error responses raise requests.HTTPError; their bodies (often HTML) aren't parsed.
+        """
+        data = ARCHIVE_CACHE.get(url)
+        if data is None:
+            resp = self.session.get(url, timeout=HTTP_TIMEOUT)
+            resp.raise_for_status()
+            data = orjson.loads(resp.content)
+            ARCHIVE_CACHE.set(url, data, expire=expire)
+        return data
     
     def get_user_matches(self, username, months=3):
         """
@@ -398,19 +663,16 @@ class ChessVisualizerCore:
             list: List of game dictionaries
         """
         try:
-            # Get all archive URLs
-            archives = self.scraper.get(
-                f"https://api.chess.com/pub/player/{username}/games/archives"
-            ).json()["archives"]
-            
-            # Take only the last `months` URLs
-            recent_urls = archives[-months:]
-            games = []
-            
-            # Fetch each archive and extend the games list
-            for url in recent_urls:
-                month_games = self.scraper.get(url).json().get("games", [])
-                games.extend(month_games)
+            # Archive URLs are predictable, so go straight for the last `months`
+            # calendar months (months without games just 404) and skip the index
+            games = self.fetch_months(recent_month_urls(username, months))
+            
+            if not games:
+                # Nothing recent (new or inactive account): take the last `months` archives listed in the index
+                archives = self.fetch_json(
+                    f"https://api.chess.com/pub/player/{username}/games/archives"
+                )["archives"]
+                games = self.fetch_months(archives[-months:])
                 
             print(f"✅ Successfully fetched {len(games)} games for {username}")
             return games
@@ -419,29 +681,74 @@ class ChessVisualizerCore:
             print(f"❌ Error fetching games for {username}: {e}")
             return []
     
+    def fetch_months(self, urls):
+        """
+        Fetch monthly archives in parallel and return their games in archive order. Missing
+        months (404) are empty, and so is any month that fails to download; the rest still count.
+        """
+        games = []
+        if not urls:
+            return games
+        
+        def fetch_month(url):
+            try:
+                month = self.fetch_json(url, expire=None if is_closed_month(url) else ARCHIVE_TTL)
+            except requests.HTTPError as e:
+                if e.response.status_code != 404:
+                    print(f"⚠️ Skipping archive {url}: {e}")
+                return []
+            except (requests.RequestException, orjson.JSONDecodeError) as e:
+                print(f"⚠️ Skipping archive {url}: {e}")
+                return []
+            return month.get("games", [])
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(urls))) as executor:
+            for month_games in executor.map(fetch_month, urls):
+                games.extend(month_games)
+        return games
+    
+    def preprocess_games(self, username, games):
+        """
+        One pass over `games` collecting username's side of each game as arrays:
+        is_white, results and ratings. Cached for the last (games, username) pair.
+        """
+        u = username.lower()
+        cache = self._player_cache  # read once; see analyze_codes
+        if cache is not None and cache[0] is games and cache[1] == u:
+            return cache[2]
+        
+        is_white = np.array([g["white"]["username"].lower() == u for g in games], dtype=bool)
+        sides = [g["white"] if w else g["black"] for g, w in zip(games, is_white)]
+        arrays = {
+            "is_white": is_white,
+            "results": np.array([p["result"] for p in sides], dtype=str),
+            "ratings": np.array([p["rating"] for p in sides], dtype=np.int64),
+        }
+        self._player_cache = (games, u, arrays)
+        return arrays
+    
     def get_current_rating(self, username, games):
         """Extract the latest rating for username from their most recent game."""
         if not games:
             return 1200  # Default rating
-        
-        last = games[0]
-        player = last["white"] if last["white"]["username"].lower() == username.lower() else last["black"]
-        return player["rating"]
+        return int(self.preprocess_games(username, games)["ratings"][0])
     
     def get_streak(self, username, games, max_checks=10):
         """Compute win(+) or loss(-) streak over the last up to max_checks games."""
-        streak = 0
-        for game in games[:max_checks]:
-            player = game["white"] if game["white"]["username"].lower() == username.lower() else game["black"]
-            result = player["result"]
-            
-            if result == "win":
-                streak = streak + 1 if streak >= 0 else 1
-            elif result in ("checkmated", "timeout", "resigned"):
-                streak = streak - 1 if streak <= 0 else -1
-            else:
-                break  # Draw or other result breaks streak
-        return streak
+        results = self.preprocess_games(username, games)["results"][:max_checks]
+        steps = np.select([results == "win", np.isin(results, LOSS_RESULTS)], [1, -1], 0)
+        
+        # Draw or other result breaks streak
+        breaks = np.flatnonzero(steps == 0)
+        if breaks.size:
+            steps = steps[:breaks[0]]
+        if not steps.size:
+            return 0
+        
+        # A win resets a losing streak and vice versa: the streak is the final run of equal steps
+        changes = np.flatnonzero(steps != steps[-1])
+        run_start = changes[-1] + 1 if changes.size else 0
+        return int(steps[-1] * (steps.size - run_start))
     
     def get_time_preferences(self, games):
         """Return a dict mapping time_control → fraction of games played."""
@@ -449,13 +756,66 @@ class ChessVisualizerCore:
         total = sum(counts.values()) or 1
         return {tc: round(cnt/total, 2) for tc, cnt in counts.items()}
     
+    def analyze_codes(self, games):
+        """
+        Parse the ECO code of every game once and derive what the charts and
+        summaries need: (codes, code_counts, family_counts, style_vec, family_bins),
+        family_bins being the per-family game counts as an array in A-E order.
+        Calling again with the same games list returns the cached result.
+        """
+        # The core is shared by the pipeline threads: read the slot once, so another
+        # thread can't swap its entry in between the check and the return
+        cache = self._codes_cache
+        if cache is not None and cache[0] is games:
+            return cache[1]
+        
+        # The game's "eco" field is an opening page URL (.../openings/Sicilian-Defense...),
+        # not a code, so the PGN tag is the only source. search() stops at the ECO tag
+        # near the top of each PGN; a findall over the joined PGNs would have to scan
+        # every game's movetext as well. Games without a PGN simply have no code
+        matches = map(_ECO_RE.search, [g.get("pgn", "") for g in games])
+        codes = [m[1] for m in matches if m]
+        code_counts = Counter(codes)
+        # Histogram over A00-E99 straight from the code bytes: "C42" -> (2, 4, 2) -> 242
+        digits = np.array(codes, dtype='S3').view(np.uint8).reshape(-1, 3).astype(np.intp)
+        idx = (digits - (ord('A'), ord('0'), ord('0'))) @ (100, 10, 1)
+        hist = np.bincount(idx, minlength=NUM_ECO_CODES)
+        # Family totals are row sums of the histogram; walking the distinct codes (in
+        # first-appearance order) keeps the families in first-appearance order too
+        family_bins = hist.reshape(len(FAMILIES), -1).sum(axis=1)
+        family_totals = dict(zip(FAMILIES, family_bins.tolist()))
+        family_counts = Counter({f: family_totals[f] for f in dict.fromkeys(code[0] for code in code_counts)})
+        style_vec = hist / (hist.sum() or 1)
+        
+        result = (codes, code_counts, family_counts, style_vec, family_bins)
+        self._codes_cache = (games, result)
+        return result
+    
+    def _get_analysis(self, username):
+        """username's analysis (see _compute_analysis), shared through run_pipeline's PIPELINE_CACHE."""
+        return run_pipeline(username)
+    
+    def _compute_analysis(self, username):
+        """
+        Fetch username's recent games and everything the charts and summaries derive
+        from them: games, codes, code_counts, family_counts, style_vec, rating, streak
+        and time_prefs. Not memoized here; callers go through run_pipeline.
+        """
+        games = self.get_user_matches(username, months=3)
+        analysis = {"username": username, "games": games}
+        if not games:
+            return analysis
+        
+        (analysis["codes"], analysis["code_counts"], analysis["family_counts"],
+         analysis["style_vec"], analysis["family_bins"]) = self.analyze_codes(games)
+        analysis["rating"] = self.get_current_rating(username, games)
+        analysis["streak"] = self.get_streak(username, games)
+        analysis["time_prefs"] = self.get_time_preferences(games)
+        return analysis
+    
     def get_style_vector(self, games):
         """Build a normalized vector representing frequencies of openings played."""
-        codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                 for g in games if '[ECO' in g["pgn"]]
-        counts = Counter(codes)
-        vec = np.array([counts.get(code, 0) for code in self.ECO_CODES], dtype=float)
-        return vec / (vec.sum() or 1)
+        return self.analyze_codes(games)[3]
     
     def comprehensive_style_visualization(self, username, top_n=15):
         """
@@ -465,158 +825,101 @@ class ChessVisualizerCore:
             username (str): Chess.com username
             top_n (int): Number of top openings to display
         """
-        games = self.get_user_matches(username, months=3)
-        if not games:
-            print(f"No games found for {username}")
-            return None, None
-        
-        # Get the style vector and extract ECO codes
-        style_vec = self.get_style_vector(games)
-        codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                 for g in games if '[ECO' in g["pgn"]]
-        code_counts = Counter(codes)
-        
-        # Create figure with subplots
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-        fig.suptitle(f"Chess Opening Style Analysis for {username}", fontsize=16, fontweight='bold')
-        
-        # 1. Heatmap of ECO codes
-        heatmap_data = style_vec.reshape(5, 100)
-        opening_families = ['A (Flank)', 'B (Semi-Open)', 'C (Open)', 'D (Closed)', 'E (Indian)']
-        
-        sns.heatmap(heatmap_data, ax=ax1, cmap='YlOrRd', 
-                    yticklabels=opening_families, xticklabels=False,
-                    cbar_kws={'label': 'Frequency'})
-        ax1.set_title('Opening Frequency Heatmap by ECO Families', fontweight='bold')
-        ax1.set_xlabel('ECO Codes (00-99)')
-        
-        # 2. Bar chart of top openings
-        if code_counts:
-            top_openings = code_counts.most_common(top_n)
-            codes_list, counts_list = zip(*top_openings)
-            
-            bars = ax2.bar(range(len(codes_list)), counts_list, color='steelblue', alpha=0.7)
-            ax2.set_xlabel('ECO Codes')
-            ax2.set_ylabel('Games Played')
-            ax2.set_title(f'Top {len(codes_list)} Most Played Openings', fontweight='bold')
-            ax2.set_xticks(range(len(codes_list)))
-            ax2.set_xticklabels(codes_list, rotation=45)
-            
-            # Add value labels
-            for bar, count in zip(bars, counts_list):
-                ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
-                        str(count), ha='center', va='bottom', fontsize=9)
-        else:
-            ax2.text(0.5, 0.5, 'No ECO data available', ha='center', va='center', transform=ax2.transAxes)
-            ax2.set_title('Top Openings (No Data)', fontweight='bold')
-        
-        # 3. Opening family distribution
-        family_counts = {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'E': 0}
-        for code in codes:
-            family_counts[code[0]] += 1
-        
-        if sum(family_counts.values()) > 0:
-            families = list(family_counts.keys())
-            counts = list(family_counts.values())
-            colors = ['#ff9999', '#66b3ff', '#99ff99', '#ffcc99', '#ff99cc']
-            
-            wedges, texts, autotexts = ax3.pie(counts, labels=families, autopct='%1.1f%%', 
-                                              colors=colors, startangle=90)
-            ax3.set_title('Distribution by Opening Families', fontweight='bold')
-        else:
-            ax3.text(0.5, 0.5, 'No ECO data available', ha='center', va='center', transform=ax3.transAxes)
-            ax3.set_title('Opening Family Distribution (No Data)', fontweight='bold')
-        
-        # 4. Summary statistics
-        ax4.axis('off')
-        total_games = len(games)
-        games_with_eco = len(codes)
-        unique_openings = len(code_counts)
-        most_played = code_counts.most_common(1)[0] if code_counts else ("N/A", 0)
-        
-        stats_text = f"""
-    📊 Style Vector Summary
-    
-    Total Games Analyzed: {total_games}
-    Games with ECO Codes: {games_with_eco}
-    Coverage: {(games_with_eco/total_games*100):.1f}%
-    
-    Unique Openings Played: {unique_openings}
-    Most Played Opening: {most_played[0]} ({most_played[1]} games)
+        return self.generate_comprehensive_viz(username, top_n=top_n, games=self._get_analysis(username)["games"])
     
-    Opening Diversity Score: {len(code_counts)/len(self.ECO_CODES)*100:.2f}%
-    (Percentage of all possible openings played)
+    def write_fig_as_data_uri(self, fig, out, fmt='png'):
         """
-        
-        ax4.text(0.1, 0.9, stats_text, transform=ax4.transAxes, fontsize=11,
-                 verticalalignment='top', bbox=dict(boxstyle="round,pad=0.5", facecolor="lightgray", alpha=0.5))
-        
-        plt.tight_layout()
-        return self.fig_to_base64(fig)
+        Render `fig` and stream it into the text buffer `out` as a base64 data URI (PNG or SVG).
+        The charts lay themselves out with tight_layout(), so this saves the figure as is:
+        bbox_inches='tight' would cost a whole extra draw pass just to trim the margins.
+        """
+        with io.BytesIO() as buffer:
+            try:
+                fig.savefig(buffer, format=fmt, dpi=FIG_DPI)
+            finally:
+                plt.close(fig)  # no-op for plain Figures; pyplot figures must not leak if savefig fails
+            out.write(f"data:{IMAGE_MIME[fmt]};base64,")
+            # Encode straight from the image buffer in chunks, so the full-size
+            # base64 bytes never exist alongside the decoded text
+            with buffer.getbuffer() as view:
+                for start in range(0, len(view), B64_CHUNK):
+                    out.write(b64encode_as_string(view[start:start + B64_CHUNK]))
+    
+    def show_fig(self, fig):
+        """Show an interactive chart, or when headless return it as a PNG data URI (closing it)."""
+        if self.headless:
+            return self.fig_to_base64(fig)
+        plt.show()
     
-    def fig_to_base64(self, fig):
-        """Convert matplotlib figure to base64 string for Langflow display."""
-        buffer = io.BytesIO()
-        fig.savefig(buffer, format='png', dpi=150, bbox_inches='tight')
-        buffer.seek(0)
-        image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        buffer.close()
-        plt.close(fig)
-        return f"data:image/png;base64,{image_base64}"
+    def fig_to_base64(self, fig, fmt='png'):
+        """Convert matplotlib figure to a base64 data URI (PNG or SVG) for Langflow display."""
+        out = io.StringIO()
+        self.write_fig_as_data_uri(fig, out, fmt)
+        return out.getvalue()
     
-    def generate_comprehensive_viz(self, username):
-        """Generate comprehensive visualization and return as base64."""
-        games = self.get_user_matches(username, months=3)
+    @fast_style
+    def generate_comprehensive_viz(self, username, top_n=10, games=None):
+        """
+        Generate the 4-panel comprehensive visualization (top `top_n` openings) and return as base64.
+        Pass `games` to reuse an already fetched list.
+        """
+        if games is None:
+            games = self.get_user_matches(username, months=3)
         if not games:
             return None
         
-        style_vec = self.get_style_vector(games)
-        codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                 for g in games if '[ECO' in g["pgn"]]
-        code_counts = Counter(codes)
+        key = render_key(f"comprehensive:{top_n}", username, games)
+        cached = cached_render(key)
+        if cached is not None:
+            return cached
         
-        # Create comprehensive visualization
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+        codes, code_counts, family_counts, style_vec, _ = self.analyze_codes(games)
+        
+        # Create comprehensive visualization (a plain Agg Figure, so nothing is left in pyplot's registry)
+        fig = Figure(figsize=(16, 12))
+        FigureCanvasAgg(fig)
+        (ax1, ax2), (ax3, ax4) = fig.subplots(2, 2)
         fig.suptitle(f"Chess Opening Analysis: {username}", fontsize=16, fontweight='bold')
         
-        # 1. Heatmap
+        # 1. Heatmap - one AxesImage for the 5x100 grid rather than a mesh of cells
         heatmap_data = style_vec.reshape(5, 100)
-        opening_families = ['A (Flank)', 'B (Semi-Open)', 'C (Open)', 'D (Closed)', 'E (Indian)']
         
-        sns.heatmap(heatmap_data, ax=ax1, cmap='YlOrRd', 
-                    yticklabels=opening_families, xticklabels=False,
-                    cbar_kws={'label': 'Frequency'})
+        im = ax1.imshow(heatmap_data, aspect='auto', cmap='YlOrRd', interpolation='nearest')
+        fig.colorbar(im, ax=ax1, label='Frequency')
+        ax1.set_xticks([])
+        ax1.set_yticks(range(len(FAMILY_LABELS)))
+        ax1.set_yticklabels(FAMILY_LABELS)
         ax1.set_title('Opening Frequency Heatmap', fontweight='bold')
         
         # 2. Top openings bar chart
         if code_counts:
-            top_openings = code_counts.most_common(10)
+            top_openings = code_counts.most_common(top_n)
             codes_list, counts_list = zip(*top_openings)
             
             bars = ax2.bar(range(len(codes_list)), counts_list, color='steelblue', alpha=0.7)
             ax2.set_xlabel('ECO Codes')
             ax2.set_ylabel('Games Played')
-            ax2.set_title('Top 10 Most Played Openings', fontweight='bold')
+            ax2.set_title(f'Top {top_n} Most Played Openings', fontweight='bold')
             ax2.set_xticks(range(len(codes_list)))
             ax2.set_xticklabels(codes_list, rotation=45)
             
             for bar, count in zip(bars, counts_list):
                 ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
                         str(count), ha='center', va='bottom', fontsize=9)
+        else:
+            ax2.text(0.5, 0.5, 'No ECO data available', ha='center', va='center', transform=ax2.transAxes)
+            ax2.set_title('Top Openings (No Data)', fontweight='bold')
         
         # 3. Family distribution pie chart
-        family_counts = {'A': 0, 'B': 0, 'C': 0, 'D': 0, 'E': 0}
-        for code in codes:
-            family_counts[code[0]] += 1
+        counts = [family_counts.get(f, 0) for f in FAMILIES]
         
-        if sum(family_counts.values()) > 0:
-            families = list(family_counts.keys())
-            counts = list(family_counts.values())
-            colors = ['#ff9999', '#66b3ff', '#99ff99', '#ffcc99', '#ff99cc']
-            
-            ax3.pie(counts, labels=families, autopct='%1.1f%%', 
-                   colors=colors, startangle=90)
+        if sum(counts) > 0:
+            ax3.pie(counts, labels=FAMILIES, autopct='%1.1f%%', 
+                   colors=FAMILY_COLORS, startangle=90)
             ax3.set_title('Opening Family Distribution', fontweight='bold')
+        else:
+            ax3.text(0.5, 0.5, 'No ECO data available', ha='center', va='center', transform=ax3.transAxes)
+            ax3.set_title('Opening Family Distribution (No Data)', fontweight='bold')
         
         # 4. Stats summary
         ax4.axis('off')
@@ -631,55 +934,64 @@ Total Games: {total_games}
 ECO Coverage: {(games_with_eco/total_games*100):.1f}%
 Unique Openings: {unique_openings}
 Favorite Opening: {most_played[0]} ({most_played[1]}x)
-Diversity Score: {len(code_counts)/len(self.ECO_CODES)*100:.2f}%"""
+Diversity Score: {len(code_counts)/NUM_ECO_CODES*100:.2f}%"""
         
         ax4.text(0.1, 0.9, stats_text, transform=ax4.transAxes, fontsize=12,
                  verticalalignment='top', 
                  bbox=dict(boxstyle="round,pad=0.5", facecolor="lightblue", alpha=0.7))
         
-        plt.tight_layout()
-        return self.fig_to_base64(fig)
+        fig.tight_layout()
+        return store_render(key, self.fig_to_base64(fig))
     
-    def generate_spider_chart(self, username):
-        """Generate spider chart and return as base64."""
-        games = self.get_user_matches(username, months=3)
+    @fast_style
+    def generate_spider_chart(self, username, games=None):
+        """Generate spider chart and return as base64. Pass `games` to reuse an already fetched list."""
+        if games is None:
+            games = self.get_user_matches(username, months=3)
         if not games:
             return None
+        
+        key = render_key("spider", username, games)
+        cached = cached_render(key)
+        if cached is not None:
+            return cached
             
-        codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                 for g in games if '[ECO' in g["pgn"]]
+        codes, code_counts, family_counts, _, family_bins = self.analyze_codes(games)
         
         if not codes:
             return None
         
-        code_counts = Counter(codes)
         rating = self.get_current_rating(username, games)
         streak = self.get_streak(username, games)
         time_prefs = self.get_time_preferences(games)
         
-        # Calculate spider metrics
-        metrics = {
-            'Tactical Play': min((code_counts.get('B01', 0) + code_counts.get('C02', 0)) / len(codes) * 300, 100),
-            'Positional Play': min((code_counts.get('D00', 0) + code_counts.get('A00', 0)) / len(codes) * 300, 100),
-            'Opening Knowledge': min((len(set(codes)) / 25) * 100, 100),
-            'Aggressive Style': min((sum(1 for c in codes if c[0] in 'BC') / len(codes)) * 100, 100),
-            'Solid Defense': min((sum(1 for c in codes if c[0] in 'DE') / len(codes)) * 100, 100),
-            'Time Management': min(time_prefs.get('600', 0) * 100 + time_prefs.get('900', 0) * 100, 100),
-            'Consistency': min(100 - abs(streak) * 10, 100),
-            'Rating Level': min((rating / 2200) * 100, 100),
-        }
+        # Calculate spider metrics (raw scores in SPIDER_METRICS order, clipped to 0-100)
+        raw = np.array([
+            sum(code_counts[c] for c in TACTICAL_CODES) / len(codes) * 300,
+            sum(code_counts[c] for c in POSITIONAL_CODES) / len(codes) * 300,
+            len(code_counts) / 25 * 100,
+            family_bins[1:3].sum() / len(codes) * 100,  # B + C
+            family_bins[3:5].sum() / len(codes) * 100,  # D + E
+            (time_prefs.get('600', 0) + time_prefs.get('900', 0)) * 100,
+            100 - abs(streak) * 10,
+            rating / 2200 * 100,
+        ])
+        metric_values = np.clip(raw, 0, 100)
         
         # Create spider chart
-        fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
+        fig = Figure(figsize=(10, 10))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots(subplot_kw=dict(projection='polar'))
         fig.suptitle(f"Chess Profile Spider Chart: {username}", fontsize=16, fontweight='bold')
         
-        categories = list(metrics.keys())
-        values = list(metrics.values())
+        categories = SPIDER_METRICS
+        values = metric_values
         
         N = len(categories)
-        angles = [n / float(N) * 2 * np.pi for n in range(N)]
-        angles += angles[:1]
-        values += values[:1]
+        angles = np.arange(N) / float(N) * 2 * np.pi
+        # Repeat the first point so the polygon closes
+        angles = np.concatenate([angles, angles[:1]])
+        values = np.concatenate([values, values[:1]])
         
         ax.plot(angles, values, 'o-', linewidth=3, label=username, color='crimson', markersize=8)
         ax.fill(angles, values, alpha=0.3, color='crimson')
@@ -694,66 +1006,60 @@ Diversity Score: {len(code_counts)/len(self.ECO_CODES)*100:.2f}%"""
         # Add value labels
         for angle, value in zip(angles[:-1], values[:-1]):
             ax.text(angle, value + 5, f'{value:.0f}', ha='center', va='center', 
-                    fontsize=10, fontweight='bold', 
-                    bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
+                    fontsize=10, fontweight='bold', bbox=VALUE_LABEL_BBOX)
         
-        plt.tight_layout()
-        return self.fig_to_base64(fig)
+        fig.tight_layout()
+        return store_render(key, self.fig_to_base64(fig, fmt='svg'))
     
-    def simple_style_visualization(self, username):
+    def simple_style_visualization(self, username, analysis=None):
         """Create a simple, clean 2-panel visualization of opening preferences."""
-        games = self.get_user_matches(username, months=3)
+        if analysis is None:
+            analysis = self._get_analysis(username)
+        games = analysis["games"]
         if not games:
             print(f"No games found for {username}")
             return
         
-        codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                 for g in games if '[ECO' in g["pgn"]]
+        codes, code_counts, family_counts = analysis["codes"], analysis["code_counts"], analysis["family_counts"]
         
         if not codes:
             print(f"No ECO data found for {username}")
             return
         
-        code_counts = Counter(codes)
-        
         # Create plot
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-        fig.suptitle(f"Opening Style Profile: {username}", fontsize=14, fontweight='bold')
-        
-        # Opening families distribution
-        family_counts = Counter(code[0] for code in codes)
-        family_names = {
-            'A': 'Flank Openings', 'B': 'Semi-Open Games', 'C': 'Open Games',
-            'D': 'Closed Games', 'E': 'Indian Defenses'
-        }
-        
-        families = [family_names.get(f, f) for f in family_counts.keys()]
-        counts = list(family_counts.values())
-        colors = plt.cm.Set3(range(len(families)))
-        
-        wedges, texts, autotexts = ax1.pie(counts, labels=families, autopct='%1.1f%%', 
-                                          colors=colors, startangle=90)
-        ax1.set_title('Opening Family Preferences')
-        
-        # Top 10 specific openings
-        top_openings = code_counts.most_common(10)
-        if top_openings:
-            eco_codes, play_counts = zip(*top_openings)
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6), layout='constrained')
+        try:
+            fig.suptitle(f"Opening Style Profile: {username}", fontsize=14, fontweight='bold')
             
-            bars = ax2.barh(range(len(eco_codes)), play_counts, color='skyblue', alpha=0.8)
-            ax2.set_yticks(range(len(eco_codes)))
-            ax2.set_yticklabels(eco_codes)
-            ax2.set_xlabel('Number of Games')
-            ax2.set_title('Top 10 Favorite Openings')
-            ax2.invert_yaxis()
+            # Opening families distribution
+            families = [FAMILY_LONG_NAMES.get(f, f) for f in family_counts.keys()]
+            counts = list(family_counts.values())
+            colors = plt.cm.Set3(range(len(families)))
             
-            # Add value labels
-            for i, (bar, count) in enumerate(zip(bars, play_counts)):
-                ax2.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height()/2,
-                        str(count), va='center', fontsize=10)
-        
-        plt.tight_layout()
-        plt.show()
+            wedges, texts, autotexts = ax1.pie(counts, labels=families, autopct='%1.1f%%', 
+                                              colors=colors, startangle=90)
+            ax1.set_title('Opening Family Preferences')
+            
+            # Top 10 specific openings
+            top_openings = code_counts.most_common(10)
+            if top_openings:
+                eco_codes, play_counts = zip(*top_openings)
+                
+                bars = ax2.barh(range(len(eco_codes)), play_counts, color='skyblue', alpha=0.8)
+                ax2.set_yticks(range(len(eco_codes)))
+                ax2.set_yticklabels(eco_codes)
+                ax2.set_xlabel('Number of Games')
+                ax2.set_title('Top 10 Favorite Openings')
+                ax2.invert_yaxis()
+                
+                # Add value labels
+                for i, (bar, count) in enumerate(zip(bars, play_counts)):
+                    ax2.text(bar.get_width() + 0.1, bar.get_y() + bar.get_height()/2,
+                            str(count), va='center', fontsize=10)
+            
+            uri = self.show_fig(fig)
+        finally:
+            plt.close(fig)  # pyplot keeps every figure alive until it is closed
         
         # Print stats
         total_games = len(codes)
@@ -765,171 +1071,163 @@ Diversity Score: {len(code_counts)/len(self.ECO_CODES)*100:.2f}%"""
         print(f"   • Different openings played: {unique_openings}")
         print(f"   • Favorite opening: {most_played[0]} ({most_played[1]} times)")
         print(f"   • Opening diversity: {unique_openings/total_games:.2%} (unique openings per game)")
+        
+        return uri
+    
+    def _draw_polar(self, ax, labels, values, color, title, ymax, label_offset=5, label_fmt='{:.0f}'):
+        """Draw one closed radar polygon of `values` (one per label) with value labels on `ax`."""
+        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False)
+        # Repeat the first point so the polygon closes
+        closed_angles = np.concatenate([angles, angles[:1]])
+        closed_values = np.concatenate([values, values[:1]])
+        
+        ax.plot(closed_angles, closed_values, 'o-', linewidth=2, color=color)
+        ax.fill(closed_angles, closed_values, alpha=0.25, color=color)
+        ax.set_xticks(angles)
+        ax.set_xticklabels(labels)
+        ax.set_ylim(0, ymax)
+        ax.set_title(title, pad=20, fontweight='bold')
+        ax.grid(True)
+        
+        for angle, value in zip(angles, values):
+            ax.text(angle, value + label_offset, label_fmt.format(value), ha='center', va='center', fontsize=10)
     
-    def radar_style_visualization(self, username):
+    def radar_style_visualization(self, username, analysis=None):
         """Create a radar chart showing opening family preferences and player characteristics."""
-        games = self.get_user_matches(username, months=3)
+        if analysis is None:
+            analysis = self._get_analysis(username)
+        games = analysis["games"]
         if not games:
             print(f"No games found for {username}")
             return
         
-        codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                 for g in games if '[ECO' in g["pgn"]]
+        codes, code_counts, family_counts = analysis["codes"], analysis["code_counts"], analysis["family_counts"]
         
         if not codes:
             print(f"No ECO data found for {username}")
             return
         
-        # Calculate opening family percentages
-        family_counts = Counter(code[0] for code in codes)
-        total_openings = sum(family_counts.values())
-        
-        family_names = ['A (Flank)', 'B (Semi-Open)', 'C (Open)', 'D (Closed)', 'E (Indian)']
-        family_percentages = []
-        
-        for family_letter in 'ABCDE':
-            count = family_counts.get(family_letter, 0)
-            percentage = (count / total_openings) * 100 if total_openings > 0 else 0
-            family_percentages.append(percentage)
+        # Calculate opening family percentages (codes is non-empty, so the total is too)
+        family_bins = analysis["family_bins"]
+        family_percentages = family_bins / family_bins.sum() * 100
+        max_family = family_percentages.max()
+        label_offset = max_family * 0.05
         
         # Create radar chart
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8), subplot_kw=dict(projection='polar'))
-        fig.suptitle(f"Radar Chart Analysis: {username}", fontsize=16, fontweight='bold')
-        
-        # First radar: Opening families
-        angles = np.linspace(0, 2 * np.pi, len(family_names), endpoint=False).tolist()
-        family_percentages += family_percentages[:1]
-        angles += angles[:1]
-        
-        ax1.plot(angles, family_percentages, 'o-', linewidth=2, label=username, color='steelblue')
-        ax1.fill(angles, family_percentages, alpha=0.25, color='steelblue')
-        ax1.set_xticks(angles[:-1])
-        ax1.set_xticklabels(family_names)
-        ax1.set_ylim(0, max(family_percentages[:-1]) * 1.2 if family_percentages[:-1] else 10)
-        ax1.set_title('Opening Family Distribution (%)', pad=20, fontweight='bold')
-        ax1.grid(True)
-        
-        # Add percentage labels
-        for angle, percentage in zip(angles[:-1], family_percentages[:-1]):
-            ax1.text(angle, percentage + max(family_percentages[:-1]) * 0.05, 
-                    f'{percentage:.1f}%', ha='center', va='center', fontsize=10)
-        
-        # Second radar: Player characteristics
-        rating = self.get_current_rating(username, games)
-        streak = self.get_streak(username, games)
-        time_prefs = self.get_time_preferences(games)
-        
-        characteristics = {
-            'Rating Level': min((rating / 2000) * 100, 100),
-            'Recent Form': min(max((streak + 5) * 10, 0), 100),
-            'Blitz Preference': time_prefs.get('60', 0) * 100,
-            'Rapid Preference': time_prefs.get('600', 0) * 100,
-            'Opening Diversity': min((len(set(codes)) / 20) * 100, 100),
-        }
-        
-        char_names = list(characteristics.keys())
-        char_values = list(characteristics.values())
-        
-        angles2 = np.linspace(0, 2 * np.pi, len(char_names), endpoint=False).tolist()
-        char_values += char_values[:1]
-        angles2 += angles2[:1]
-        
-        ax2.plot(angles2, char_values, 'o-', linewidth=2, label=username, color='orange')
-        ax2.fill(angles2, char_values, alpha=0.25, color='orange')
-        ax2.set_xticks(angles2[:-1])
-        ax2.set_xticklabels(char_names)
-        ax2.set_ylim(0, 100)
-        ax2.set_title('Player Characteristics (0-100%)', pad=20, fontweight='bold')
-        ax2.grid(True)
-        
-        # Add value labels
-        for angle, value in zip(angles2[:-1], char_values[:-1]):
-            ax2.text(angle, value + 5, f'{value:.0f}', ha='center', va='center', fontsize=10)
-        
-        plt.tight_layout()
-        plt.show()
+        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8), subplot_kw=dict(projection='polar'),
+                                       layout='constrained')
+        try:
+            fig.suptitle(f"Radar Chart Analysis: {username}", fontsize=16, fontweight='bold')
+            
+            # First radar: Opening families
+            self._draw_polar(ax1, FAMILY_LABELS, family_percentages, 'steelblue',
+                             'Opening Family Distribution (%)', max_family * 1.2,
+                             label_offset=label_offset, label_fmt='{:.1f}%')
+            
+            # Second radar: Player characteristics
+            rating, streak, time_prefs = analysis["rating"], analysis["streak"], analysis["time_prefs"]
+            
+            # Raw scores in RADAR_CHARACTERISTICS order, clipped to 0-100
+            char_values = np.clip(np.array([
+                rating / 2000 * 100,
+                (streak + 5) * 10,
+                time_prefs.get('60', 0) * 100,
+                time_prefs.get('600', 0) * 100,
+                len(code_counts) / 20 * 100,
+            ]), 0, 100)
+            characteristics = dict(zip(RADAR_CHARACTERISTICS, char_values.tolist()))
+            
+            self._draw_polar(ax2, RADAR_CHARACTERISTICS, char_values, 'orange',
+                             'Player Characteristics (0-100%)', 100)
+            
+            uri = self.show_fig(fig)
+        finally:
+            plt.close(fig)  # pyplot keeps every figure alive until it is closed
         
         # Print summary
         print(f"\n🎯 Radar Chart Summary for {username}:")
-        print(f"   • Most played opening family: {family_names[np.argmax(family_percentages[:-1])]}")
+        print(f"   • Most played opening family: {FAMILY_LABELS[family_percentages.argmax()]}")
         print(f"   • Opening diversity: {characteristics['Opening Diversity']:.1f}/100")
         print(f"   • Rating level: {characteristics['Rating Level']:.1f}/100 (ELO: {rating})")
         print(f"   • Recent form: {characteristics['Recent Form']:.1f}/100 (Streak: {streak})")
+        
+        return uri
     
-    def spider_style_visualization(self, username):
+    def spider_style_visualization(self, username, analysis=None):
         """Create a spider chart showing detailed opening preferences and playing patterns."""
-        games = self.get_user_matches(username, months=3)
+        if analysis is None:
+            analysis = self._get_analysis(username)
+        games = analysis["games"]
         if not games:
             print(f"No games found for {username}")
             return
         
-        codes = [re.search(r'\[ECO "([A-E]\d{2})"\]', g["pgn"]).group(1) 
-                 for g in games if '[ECO' in g["pgn"]]
+        codes, code_counts, family_counts = analysis["codes"], analysis["code_counts"], analysis["family_counts"]
         
         if not codes:
             print(f"No ECO data found for {username}")
             return
         
-        code_counts = Counter(codes)
-        
         # Calculate comprehensive metrics
-        rating = self.get_current_rating(username, games)
-        streak = self.get_streak(username, games)
-        time_prefs = self.get_time_preferences(games)
-        
-        metrics = {
-            'Tactical Sharpness': min((code_counts.get('B01', 0) + code_counts.get('C02', 0) + 
-                                      code_counts.get('C44', 0)) / len(codes) * 500, 100),
-            'Positional Play': min((code_counts.get('D00', 0) + code_counts.get('D06', 0) + 
-                                   code_counts.get('A00', 0)) / len(codes) * 500, 100),
-            'Opening Knowledge': min((len(set(codes)) / 30) * 100, 100),
-            'Aggressive Style': min((sum(1 for c in codes if c[0] in 'BC') / len(codes)) * 100, 100),
-            'Solid Defense': min((sum(1 for c in codes if c[0] in 'DE') / len(codes)) * 100, 100),
-            'Time Management': min(time_prefs.get('600', 0) * 100 + time_prefs.get('900', 0) * 100, 100),
-            'Consistency': min(100 - abs(streak) * 10, 100),
-            'Rating Strength': min((rating / 2500) * 100, 100),
-        }
+        rating, streak, time_prefs = analysis["rating"], analysis["streak"], analysis["time_prefs"]
+        family_bins = analysis["family_bins"]
+        
+        raw = np.array([
+            sum(code_counts[c] for c in DETAILED_TACTICAL_CODES) / len(codes) * 500,
+            sum(code_counts[c] for c in DETAILED_POSITIONAL_CODES) / len(codes) * 500,
+            len(code_counts) / 30 * 100,
+            family_bins[1:3].sum() / len(codes) * 100,  # B + C
+            family_bins[3:5].sum() / len(codes) * 100,  # D + E
+            (time_prefs.get('600', 0) + time_prefs.get('900', 0)) * 100,
+            100 - abs(streak) * 10,
+            rating / 2500 * 100,
+        ])
+        metric_values = np.clip(raw, 0, 100)
+        metrics = dict(zip(DETAILED_SPIDER_METRICS, metric_values.tolist()))
         
         # Create spider chart
-        fig, ax = plt.subplots(figsize=(12, 12), subplot_kw=dict(projection='polar'))
-        fig.suptitle(f"Spider Chart: Detailed Chess Profile - {username}", fontsize=16, fontweight='bold')
-        
-        categories = list(metrics.keys())
-        values = list(metrics.values())
-        
-        N = len(categories)
-        angles = [n / float(N) * 2 * np.pi for n in range(N)]
-        angles += angles[:1]
-        values += values[:1]
-        
-        ax.plot(angles, values, 'o-', linewidth=3, label=username, color='crimson', markersize=8)
-        ax.fill(angles, values, alpha=0.3, color='crimson')
-        
-        ax.set_xticks(angles[:-1])
-        ax.set_xticklabels(categories, fontsize=11)
-        ax.set_ylim(0, 100)
-        ax.set_yticks([20, 40, 60, 80, 100])
-        ax.set_yticklabels(['20', '40', '60', '80', '100'], fontsize=10)
-        ax.grid(True)
-        
-        # Add value labels
-        for angle, value, category in zip(angles[:-1], values[:-1], categories):
-            ax.text(angle, value + 5, f'{value:.0f}', ha='center', va='center', 
-                    fontsize=10, fontweight='bold', 
-                    bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
-        
-        ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
-        
-        plt.tight_layout()
-        plt.show()
+        fig, ax = plt.subplots(figsize=(12, 12), subplot_kw=dict(projection='polar'), layout='constrained')
+        try:
+            fig.suptitle(f"Spider Chart: Detailed Chess Profile - {username}", fontsize=16, fontweight='bold')
+            
+            categories = DETAILED_SPIDER_METRICS
+            values = metric_values
+            
+            N = len(categories)
+            angles = np.arange(N) / float(N) * 2 * np.pi
+            # Repeat the first point so the polygon closes
+            angles = np.concatenate([angles, angles[:1]])
+            values = np.concatenate([values, values[:1]])
+            
+            ax.plot(angles, values, 'o-', linewidth=3, label=username, color='crimson', markersize=8)
+            ax.fill(angles, values, alpha=0.3, color='crimson')
+            
+            ax.set_xticks(angles[:-1])
+            ax.set_xticklabels(categories, fontsize=11)
+            ax.set_ylim(0, 100)
+            ax.set_yticks([20, 40, 60, 80, 100])
+            ax.set_yticklabels(['20', '40', '60', '80', '100'], fontsize=10)
+            ax.grid(True)
+            
+            # Add value labels
+            for angle, value, category in zip(angles[:-1], values[:-1], categories):
+                ax.text(angle, value + 5, f'{value:.0f}', ha='center', va='center', 
+                        fontsize=10, fontweight='bold', bbox=VALUE_LABEL_BBOX)
+            
+            ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
+            
+            uri = self.show_fig(fig)
+        finally:
+            plt.close(fig)  # pyplot keeps every figure alive until it is closed
         
         # Analysis
         print(f"\n🕷️ Spider Chart Analysis for {username}:")
         print("=" * 50)
         
-        sorted_metrics = sorted(metrics.items(), key=lambda x: x[1], reverse=True)
-        strengths = sorted_metrics[:3]
-        weaknesses = sorted_metrics[-3:]
+        # Highest first; a stable sort keeps ties in metric order, like sorted(reverse=True)
+        order = np.argsort(-values[:-1], kind='stable')
+        strengths = [(categories[i], values[i]) for i in order[:3]]
+        weaknesses = [(categories[i], values[i]) for i in order[-3:]]
         
         print("🔥 Top Strengths:")
         for i, (metric, value) in enumerate(strengths, 1):
@@ -939,7 +1237,7 @@ Diversity Score: {len(code_counts)/len(self.ECO_CODES)*100:.2f}%"""
         for i, (metric, value) in enumerate(weaknesses, 1):
             print(f"   {i}. {metric}: {value:.1f}/100")
         
-        overall_score = np.mean(list(metrics.values()))
+        overall_score = values[:-1].mean()  # drop the closing point
         if overall_score >= 70:
             style_assessment = "🏆 Elite Player"
         elif overall_score >= 50:
@@ -960,6 +1258,23 @@ Diversity Score: {len(code_counts)/len(self.ECO_CODES)*100:.2f}%"""
             print("   • Work on time management in longer time controls")
         if metrics['Consistency'] < 50:
             print("   • Focus on maintaining steady performance")
+        
+        return uri
+    
+    def _render_chart(self, kind, username, analysis, pool=None, future=None):
+        """
+        Data URI of one interactive chart (None without data): the worker's result when `future`
+        is given, otherwise drawn here. So is a chart whose worker couldn't run (e.g. the job
+        failed to pickle) or didn't answer within CHART_TIMEOUT; a pool that broke or hung is dropped.
+        """
+        if future is not None:
+            try:
+                return future.result(timeout=CHART_TIMEOUT)
+            except Exception as e:
+                print(f"⚠️ {kind} chart worker failed ({e!r}); rendering in process")
+                if isinstance(e, (TimeoutError, BrokenProcessPool)):
+                    drop_chart_pool(pool)
+        return getattr(self, f"{kind}_style_visualization")(username, analysis=analysis)
     
     def generate_all_charts(self, username):
         """
@@ -967,27 +1282,51 @@ Diversity Score: {len(code_counts)/len(self.ECO_CODES)*100:.2f}%"""
         
         Args:
             username (str): Chess.com username to analyze
+        
+        Returns:
+            list: PNG data URIs of the comprehensive, simple, radar and spider charts
+            (when headless; charts without data are left out)
         """
+        charts = []
         print(f"🎯 Generating comprehensive chess analysis for: {username}")
         print("=" * 60)
         
         try:
-            print("\n📊 1. Comprehensive Style Analysis...")
-            self.comprehensive_style_visualization(username)
+            # Fetch and analyse once; every chart below reads this analysis
+            analysis = self._get_analysis(username)
             
-            print("\n📈 2. Simple Style Profile...")
-            self.simple_style_visualization(username)
+            pool = None
+            futures = dict.fromkeys(INTERACTIVE_CHARTS)
+            if self.headless and analysis["games"]:
+                # Headless charts only produce data URIs, so they can render in
+                # worker processes while the comprehensive chart renders here
+                pool = chart_pool()
+                try:
+                    futures = {kind: pool.submit(render_interactive_chart, kind, username, analysis)
+                               for kind in INTERACTIVE_CHARTS}
+                except BrokenProcessPool as e:
+                    print(f"⚠️ Chart pool unavailable ({e!r}); rendering in process")
+                    drop_chart_pool(pool)
             
-            print("\n🎯 3. Radar Chart Analysis...")
-            self.radar_style_visualization(username)
+            print("\n📊 1. Comprehensive Style Analysis...")
+            charts.append(self.comprehensive_style_visualization(username))
             
-            print("\n🕷️ 4. Spider Chart Profile...")
-            self.spider_style_visualization(username)
+            for title, kind in (("📈 2. Simple Style Profile...", "simple"),
+                                ("🎯 3. Radar Chart Analysis...", "radar"),
+                                ("🕷️ 4. Spider Chart Profile...", "spider")):
+                print(f"\n{title}")
+                charts.append(self._render_chart(kind, username, analysis, pool, futures[kind]))
             
             print(f"\n✅ Analysis complete for {username}!")
             
         except Exception as e:
             print(f"❌ Error generating charts for {username}: {e}")
+        
+        return [uri for uri in charts if uri]
+
+
+# Shared by all component outputs so the HTTP session and parse/render caches carry over
+visualizer_core = ChessVisualizerCore()
 
 
 # End of ChessVisualizerCore class - no main() function needed for Langflow components
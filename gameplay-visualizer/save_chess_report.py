@@ -3,11 +3,14 @@ Custom Save File Component for HTML Chess Reports
 Extends the Langflow Save File component to handle HTML files
 """
 
-import json
+import io
+import re
+import time
 from collections.abc import AsyncIterator, Iterator
 from pathlib import Path
 from datetime import datetime
 
+import anyio
 import orjson
 import pandas as pd
 from fastapi import UploadFile
@@ -22,6 +25,62 @@ from langflow.services.database.models.user.crud import get_user_by_id
 from langflow.services.deps import get_session, get_settings_service, get_storage_service
 from langflow.template.field.base import Output
 
+# Page shell wrapped around HTML fragments saved as .html
+HTML_SHELL_START = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Langflow Output</title>
+</head>
+<body>
+"""
+HTML_SHELL_END = """
+</body>
+</html>"""
+# Only this much of the content is looked at to tell a full document from a fragment
+HTML_SNIFF_CHARS = 256
+
+# Id of the user uploads are made as, with the monotonic time its token was created.
+# Kept well inside the long-term token's own lifetime. Only the id is cached: the
+# user row belongs to the session it was loaded in, so each upload loads its own
+_USER_CACHE: dict[str, tuple[float, object]] = {}
+_USER_CACHE_TTL = 3600  # seconds
+
+
+async def iter_text_chunks(text):
+    """Yield the chunks of a streamed Message text (async or plain iterator) as strings."""
+    if isinstance(text, AsyncIterator):
+        async for item in text:
+            yield str(item)
+    else:
+        for item in text:
+            yield str(item)
+
+
+async def read_text(text) -> str:
+    """Collect Message text into one string; streamed chunks are joined once rather than appended."""
+    if text is None:
+        return ""
+    if isinstance(text, (AsyncIterator, Iterator)):
+        return "".join([chunk async for chunk in iter_text_chunks(text)])
+    return str(text)
+
+
+async def get_upload_user(db):
+    """
+    The (user_id, user) uploads are made as, with the user loaded in `db`. The token
+    is created at most once per _USER_CACHE_TTL; the user is fetched in every session.
+    """
+    now = time.monotonic()
+    cached = _USER_CACHE.get("_default")
+    if cached is not None and now - cached[0] < _USER_CACHE_TTL:
+        user_id = cached[1]
+    else:
+        user_id, _ = await create_user_longterm_token(db)
+        _USER_CACHE["_default"] = (now, user_id)
+    return user_id, await get_user_by_id(db, user_id)
+
 
 class CustomSaveToFileComponent(Component):
     display_name = "Save Chess Report"
@@ -34,6 +93,17 @@ class CustomSaveToFileComponent(Component):
     DATA_FORMAT_CHOICES = ["csv", "excel", "json", "markdown"]
     MESSAGE_FORMAT_CHOICES = ["txt", "json", "markdown", "html"]
 
+    # Where the username may appear in the report, tried in this order (compiled once)
+    USERNAME_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+        r'<h2>([^<]+)</h2>',  # Username in h2 tag (most likely)
+        r'Chess Style Analysis: ([^<]+)',  # In title text
+        r'Report - ([^<]+)</title>',  # In page title
+        r'chess_analysis_([^_]+)_',  # In existing filename patterns
+        r'Username: ([^<\s]+)',  # Direct username label
+        r'username["\s:]*["\s]*([a-zA-Z0-9_]+)',  # General username pattern
+    ))
+    VALID_USERNAME = re.compile(r'^[a-zA-Z0-9_]+$')
+
     inputs = [
         HandleInput(
             name="html_content",
@@ -60,38 +130,21 @@ class CustomSaveToFileComponent(Component):
             msg = "HTML content must be provided."
             raise ValueError(msg)
 
-        # Extract HTML content from Message
-        html_content = ""
-        if isinstance(self.html_content.text, AsyncIterator):
-            async for item in self.html_content.text:
-                html_content += str(item)
-        elif isinstance(self.html_content.text, Iterator):
-            html_content = "".join(str(item) for item in self.html_content.text)
-        else:
-            html_content = str(self.html_content.text)
+        # Extract HTML content from Message (the username is read from it before the file is named)
+        html_content = await read_text(self.html_content.text)
 
         # Extract username from HTML content (look for username in the HTML)
         username = "unknown_user"
         try:
-            # Look for username in the HTML title or content
-            import re
-            
-            # Try multiple patterns to find username
-            patterns = [
-                r'<h2>([^<]+)</h2>',  # Username in h2 tag (most likely)
-                r'Chess Style Analysis: ([^<]+)',  # In title text
-                r'Report - ([^<]+)</title>',  # In page title
-                r'chess_analysis_([^_]+)_',  # In existing filename patterns
-                r'Username: ([^<\s]+)',  # Direct username label
-                r'username["\s:]*["\s]*([a-zA-Z0-9_]+)',  # General username pattern
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, html_content, re.IGNORECASE)
+            # Look for username in the HTML title or content. Patterns keep their
+            # priority: the first one whose first match is a valid username wins
+            # (for our reports the header <h2> matches within the first few KB)
+            for pattern in self.USERNAME_PATTERNS:
+                match = pattern.search(html_content)
                 if match:
                     extracted = match.group(1).strip()
                     # Make sure it's a valid username (alphanumeric + underscore only)
-                    if re.match(r'^[a-zA-Z0-9_]+$', extracted) and len(extracted) > 2:
+                    if self.VALID_USERNAME.match(extracted) and len(extracted) > 2:
                         username = extracted
                         break
             
@@ -102,7 +155,8 @@ class CustomSaveToFileComponent(Component):
             username = "unknown_user"
 
         # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         filename = f"chess_analysis_{username}_{timestamp}.html"
         
         # Prepare file path
@@ -111,11 +165,12 @@ class CustomSaveToFileComponent(Component):
         file_path = save_dir / filename
 
         try:
-            # Save HTML file
-            file_path.write_text(html_content, encoding='utf-8')
+            # Save HTML file, encoding once for both the file and the upload
+            html_bytes = html_content.encode('utf-8')
+            file_path.write_bytes(html_bytes)
             
             # Upload the saved file
-            await self._upload_file(file_path)
+            await self._upload_file(file_path, html_bytes)
 
             # Return confirmation
             absolute_path = file_path.absolute()
@@ -124,8 +179,8 @@ class CustomSaveToFileComponent(Component):
 📁 File Details:
 • Location: {absolute_path}
 • Username: {username}
-• Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-• File Size: {file_path.stat().st_size / 1024:.1f} KB
+• Generated: {now.strftime("%Y-%m-%d %H:%M:%S")}
+• File Size: {len(html_bytes) / 1024:.1f} KB
 
 🌐 To view your report:
 1. Open the file in any web browser
@@ -140,20 +195,15 @@ The report includes comprehensive opening analysis and player profile visualizat
             error_msg = f"❌ Error saving chess report: {str(e)}"
             raise ValueError(error_msg)
 
-    async def _upload_file(self, file_path: Path) -> None:
-        """Upload the saved file using the upload_user_file service."""
-        if not file_path.exists():
-            msg = f"File not found: {file_path}"
-            raise FileNotFoundError(msg)
-
+    async def _upload_file(self, file_path: Path, data: bytes) -> None:
+        """Upload the saved file's contents (`data`, already in memory) using the upload_user_file service."""
         try:
-            with file_path.open("rb") as f:
+            with io.BytesIO(data) as f:
                 async for db in get_session():
-                    user_id, _ = await create_user_longterm_token(db)
-                    current_user = await get_user_by_id(db, user_id)
+                    _, current_user = await get_upload_user(db)
 
                     await upload_user_file(
-                        file=UploadFile(filename=file_path.name, file=f, size=file_path.stat().st_size),
+                        file=UploadFile(filename=file_path.name, file=f, size=len(data)),
                         session=db,
                         current_user=current_user,
                         storage_service=get_storage_service(),
@@ -321,8 +371,7 @@ class EnhancedSaveToFileComponent(Component):
         try:
             with file_path.open("rb") as f:
                 async for db in get_session():
-                    user_id, _ = await create_user_longterm_token(db)
-                    current_user = await get_user_by_id(db, user_id)
+                    _, current_user = await get_upload_user(db)
 
                     await upload_user_file(
                         file=UploadFile(filename=file_path.name, file=f, size=file_path.stat().st_size),
@@ -357,8 +406,8 @@ class EnhancedSaveToFileComponent(Component):
         elif fmt == "excel":
             pd.DataFrame(data.data).to_excel(path, index=False, engine="openpyxl")
         elif fmt == "json":
-            path.write_text(
-                orjson.dumps(jsonable_encoder(data.data), option=orjson.OPT_INDENT_2).decode("utf-8"), encoding="utf-8"
+            path.write_bytes(
+                orjson.dumps(jsonable_encoder(data.data), option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
             )
         elif fmt == "markdown":
             path.write_text(pd.DataFrame(data.data).to_markdown(index=False), encoding="utf-8")
@@ -369,39 +418,52 @@ class EnhancedSaveToFileComponent(Component):
 
     async def _save_message(self, message: Message, path: Path, fmt: str) -> str:
         """Enhanced save message with HTML support."""
-        content = ""
-        if message.text is None:
-            content = ""
-        elif isinstance(message.text, AsyncIterator):
-            async for item in message.text:
-                content += str(item)
-        elif isinstance(message.text, Iterator):
-            content = "".join(str(item) for item in message.text)
-        else:
-            content = str(message.text)
+        if fmt == "html" and isinstance(message.text, (AsyncIterator, Iterator)):
+            # Streamed HTML goes to disk chunk by chunk, never held as one string
+            await self._write_html_stream(message.text, path)
+            return f"Message saved successfully"
+
+        content = await read_text(message.text)
 
         if fmt == "txt":
             path.write_text(content, encoding="utf-8")
         elif fmt == "json":
-            path.write_text(json.dumps({"message": content}, indent=2), encoding="utf-8")
+            path.write_bytes(orjson.dumps({"message": content}, option=orjson.OPT_INDENT_2))
         elif fmt == "markdown":
             path.write_text(f"**Message:**\n\n{content}", encoding="utf-8")
         elif fmt == "html":
             # Enhanced HTML saving with proper DOCTYPE if missing
-            if not content.strip().startswith("<!DOCTYPE") and not content.strip().startswith("<html"):
-                content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Langflow Output</title>
-</head>
-<body>
-{content}
-</body>
-</html>"""
-            path.write_text(content, encoding="utf-8")
+            if self._needs_html_shell(content):
+                content = f"{HTML_SHELL_START}{content}{HTML_SHELL_END}"
+            # One encode straight into write_bytes, skipping the text-mode file wrapper
+            path.write_bytes(content.encode("utf-8"))
         else:
             msg = f"Unsupported Message format: {fmt}"
             raise ValueError(msg)
         return f"Message saved successfully"
+
+    @staticmethod
+    def _needs_html_shell(content: str) -> bool:
+        """True if `content` is an HTML fragment rather than a full document."""
+        # Strip and lowercase a short slice, not the whole (possibly megabyte) document
+        start = content[:HTML_SNIFF_CHARS].lstrip().lower()
+        return not start.startswith(("<!doctype", "<html"))
+
+    async def _write_html_stream(self, text, path: Path) -> None:
+        """Write streamed HTML to `path` as it arrives, adding the page shell around fragments."""
+        async with await anyio.open_file(path, "w", encoding="utf-8") as f:
+            head = ""  # held back until it shows whether the content is a full document
+            wrap = None
+            async for chunk in iter_text_chunks(text):
+                if wrap is not None:
+                    await f.write(chunk)
+                    continue
+                head += chunk
+                if len(head.lstrip()) >= len("<!DOCTYPE"):
+                    wrap = self._needs_html_shell(head)
+                    await f.write(f"{HTML_SHELL_START}{head}" if wrap else head)
+            if wrap is None:  # whole content shorter than the check
+                wrap = self._needs_html_shell(head)
+                await f.write(f"{HTML_SHELL_START}{head}" if wrap else head)
+            if wrap:
+                await f.write(HTML_SHELL_END)